@@ -1,16 +1,30 @@
-from grammar import Grammar, Production, Terminal, eof
+from grammar import Grammar, Symbol, Terminal, NonTerminal, eof
 import LR
+import LR0
 import LR1
-from LR import dot, SHIFT, REDUCE, ACCEPT
+from LR import after_dot
 from collections import defaultdict
 
 
+# A placeholder lookahead used to discover lookahead propagation.
+# It is not a terminal of any grammar (same trick as LR.dot).
+class Unknown(Terminal):
+    pass
+
+
+unknown = Unknown('#')
+
+
 # TODO: message error on conflicts
 def construct_parsing_table(G: Grammar) -> LR.ParsingTable:
     """
 Construct a LALR(1) parsing table for grammar G.
-This function will first construct the parsing table for LR(1),
-and then combine the states with common core items into one state.
+
+Instead of building the whole LR(1) canonical set and merging the states
+with common core items (the LR(0) collection is typically much smaller
+than the LR(1) one), this function builds the LR(0) canonical set, then
+computes the lookaheads of the kernel items by spontaneous generation
+and propagation (the dragon book algorithm 4.63).
 
 The definition of class ParsingTable is as follow:
 ```
@@ -27,77 +41,97 @@ action: maps a tuple of (state, symbol) to an action, either SHIFT, REDUCE or AC
     - if action is ACCEPT, the return value is (ACCEPT, None).
 goto: the GOTO table, maps a tuple of (state, symbol) to a state.
     """
-    pt = LR1.construct_parsing_table(G)
-
-    # a map from state to its core state
-    state_to_index: dict[LR.ItemSet, int] = {}
-    index_to_core: dict[int, LR.ItemSet] = {}
-    core_to_index: dict[LR.ItemSet, int] = {}
-
-    # records what should be in the lookahead of one core item.
-    # lookaheads =  mapping of (core state, core item) ->  lookaheads
+    C = LR0.construct_canonical_set(G)
+
+    # impose an order to states, and ensure 0 is starting state
+    i = 1
+    states: dict[int, LR.ItemSet] = {}
+    for state in C:
+        if any(item.lhs == G.start_symbol and item.dot_pos == 0 for item in state):
+            states[0] = state
+        else:
+            states[i] = state
+            i += 1
+
+    r_states = {v: k for k, v in states.items()}
+
+    # the transitions of the LR(0) automaton
+    transitions: dict[tuple[int, Symbol], int] = {}
+    for i, state in states.items():
+        for x in {after_dot(item) for item in state}:
+            if isinstance(x, (Terminal, NonTerminal)):
+                transitions[i, x] = r_states[LR0.goto(G, state, x)]
+
+    def kernel(state: LR.ItemSet) -> list[LR.Item]:
+        # the kernel items: [S' -> •S] and every item whose • is not leftmost
+        return [item for item in state
+                if item.dot_pos > 0 or item.lhs == G.start_symbol]
+
+    # lookaheads = mapping of (state, kernel item) -> lookaheads known so far
     lookaheads: dict[tuple[int, LR.Item], set[Terminal]] = defaultdict(set)
 
-    # merging all states having the same core
-    # kinda mess
-    index = 0
-    for state in pt.states.values():
-        core_state = LR.ItemSet()
-        item_to_lookaheads = defaultdict(set)
-        for item in state:
-            core_item = LR.Item(item.lhs, item.rhs[:], set())
-            item_to_lookaheads[core_item].add(item.lookahead)
-            core_state.add(core_item)
-
-        if core_state not in core_to_index:
-            core_to_index[core_state] = index
-            index_to_core[index] = core_state
-            index += 1
-
-        for core_item, symbols in item_to_lookaheads.items():
-            for symbol in symbols:
-                lookaheads[core_to_index[core_state], core_item].add(symbol)
-
-        state_to_index[state] = core_to_index[core_state]
-
-    # add the lookahead symbols to core states
-    for (core_index, core_item), symbols in lookaheads.items():
-        index_to_core[core_index].remove(core_item)
-        index_to_core[core_index].add(
-            LR.Item(core_item.lhs, core_item.rhs, symbols))
-
-    # from now on the states with same core have been merged
-    core_to_index = {v: k for k, v in index_to_core.items()}
-
-    # start filling in the parsing table
-    ACTION = {}
-    GOTO = {}
-
-    for state in pt.states.values():
-        core_index = state_to_index[state]
-        for item in index_to_core[core_index]:
-            A = LR.after_dot(item)
-            if isinstance(A, Terminal):
-                # the symbol after • is a terminal
-                goto_state = LR1.goto(G, state, A)
-                goto_core_index = state_to_index[goto_state]
-                ACTION[core_index, A] = (SHIFT, goto_core_index)
-
-            elif A is None and item.lhs == G.start_symbol and item.rhs[-1] == dot and eof in item.lookahead:
-                # acceptable state: item = [S' -> S •, $/../...]
-                ACTION[core_index, eof] = (ACCEPT, None)
-
-            elif A is None and item.lhs != G.start_symbol:
-                # • is at the end of this item, as [B -> alpha •, ...}
-                action = (REDUCE, Production(item.lhs, item.rhs[:-1]))
-                for symbol in item.lookahead:
-                    ACTION[core_index, symbol] = action
-
-        # construct GOTO[i, n] for all non-terminals n
-        for n in G.non_terminals():
-            goto_state = LR1.goto(G, state, n)
-            if len(goto_state) > 0:
-                goto_core_index = state_to_index[goto_state]
-                GOTO[core_index, n] = goto_core_index
-
-    return LR.ParsingTable(index_to_core, ACTION, GOTO)
+    # propagations = mapping of (state, kernel item) -> the (state, kernel item)
+    # entries its lookaheads propagate to
+    propagations: dict[tuple[int, LR.Item], list[tuple[int, LR.Item]]] = defaultdict(list)
+
+    start_item = LR.Item(G.start_symbol,
+                         tuple(G.productions_from(G.start_symbol)[0].rhs))
+    lookaheads[0, start_item].add(eof)
+
+    # discover spontaneous lookaheads and propagation edges: close each kernel
+    # item under LR(1) rules with the `unknown` lookahead — a real lookahead in
+    # the result is spontaneous, `unknown` marks a propagation edge
+    for i, state in states.items():
+        for k in kernel(state):
+            probe = LR1.closure(G, LR.ItemSet(
+                {LR.Item(k.lhs, k.rhs, k.dot_pos, unknown)}))
+            for item in probe:
+                x = after_dot(item)
+                if not isinstance(x, (Terminal, NonTerminal)):
+                    continue
+
+                target = transitions[i, x], LR.Item(item.lhs, item.rhs, item.dot_pos + 1)
+                if item.lookahead == unknown:
+                    propagations[i, k].append(target)
+                else:
+                    lookaheads[target].add(item.lookahead)
+
+    # propagate the lookaheads until fixed point
+    # (look each set up once per visit, not once per operation)
+    workset = list(lookaheads)
+    while len(workset) > 0:
+        source = workset.pop()
+        source_lookaheads = lookaheads[source]
+        for target in propagations.get(source, ()):
+            target_lookaheads = lookaheads[target]
+            new = source_lookaheads - target_lookaheads
+            if new:
+                target_lookaheads |= new
+                workset.append(target)
+
+    # expand every LR(0) state to its LALR(1) items: close the kernel items
+    # with their computed lookaheads, then merge items sharing a core
+    lalr_states: dict[int, LR.ItemSet] = {}
+    for i, state in states.items():
+        seed = LR.ItemSet()
+        for k in kernel(state):
+            for a in lookaheads[i, k]:
+                seed.add(LR.Item(k.lhs, k.rhs, k.dot_pos, a))
+
+        merged = defaultdict(set)
+        for item in LR1.closure(G, seed):
+            merged[item.lhs, item.rhs, item.dot_pos].add(item.lookahead)
+
+        lalr_states[i] = LR.ItemSet({
+            LR.Item(lhs, rhs, dot_pos, frozenset(symbols))
+            for (lhs, rhs, dot_pos), symbols in merged.items()})
+
+    # start filling in the parsing table;
+    # an LALR(1) item reduces on its whole merged lookahead set, and every
+    # transition target is already known from the LR(0) automaton
+    ACTION, GOTO = LR.fill_tables(
+        G, lalr_states,
+        goto_target=lambda i, state, x: transitions[i, x],
+        reduce_lookaheads=lambda item: item.lookahead)
+
+    return LR.ParsingTable(lalr_states, ACTION, GOTO)
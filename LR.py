@@ -1,7 +1,8 @@
 # utilities & classes commonly used in all LR parsers.
 
-from grammar import Grammar, Symbol, Terminal, NonTerminal
+from grammar import Grammar, Production, Symbol, Terminal, NonTerminal, eof
 
+from array import array
 from dataclasses import dataclass, field
 from copy import copy
 from typing import Optional, Any, Union
@@ -19,40 +20,23 @@ dot = Dot('•')
 @dataclass(eq=True, frozen=True)
 class Item:
     lhs: NonTerminal
-    rhs: list[Symbol]
 
-    # lookahead different for LR(1) item, LALR(1) item, SLR(1) item
-    lookahead: Union[Terminal, set[Terminal], None] = None
+    # the production rhs without the •, whose position is kept in dot_pos,
+    # so that moving the • or reading the symbol after it costs O(1)
+    rhs: tuple[Symbol, ...]
+    dot_pos: int = 0
+
+    # lookahead different for LR(1) item (a single terminal), LALR(1) item
+    # (a frozenset of terminals) and LR(0)/SLR(1) item (empty frozenset)
+    lookahead: Union[Terminal, frozenset[Terminal]] = frozenset()
 
     def __repr__(self):
-        r = ' '.join(map(str, self.rhs))
+        r = ' '.join(map(str, self.rhs[:self.dot_pos] + (dot,) + self.rhs[self.dot_pos:]))
         if self.lookahead:
             return f'[{self.lhs} -> {r}, {self.lookahead}]'
         else:
             return f'[{self.lhs} -> {r}]'
 
-    # let it hashable for more utilizable
-    def __hash__(self):
-        x = hash(self.lhs)
-        if isinstance(self.lookahead, (Terminal, type(None))):
-            x ^= hash(self.lookahead)
-        elif isinstance(self.lookahead, set):
-            for symbol in self.lookahead:
-                x ^= hash(symbol)
-        else:
-            raise TypeError('invalid type for lookahead', type(self.lookahead))
-
-        for y in self.rhs:
-            x ^= hash(y)
-
-        return x
-
-    def __copy__(self):
-        return Item(copy(self.lhs), self.rhs.copy(), copy(self.lookahead))
-
-    def __eq__(self, x):
-        return (self.lhs, self.rhs, self.lookahead) == (x.lhs, x.rhs, x.lookahead)
-
     def __lt__(self, other):
         return self.lhs < other.lhs
 
@@ -69,11 +53,14 @@ class ItemSet:
     """
     items: set[Item] = field(default_factory=set)
 
+    # lazily computed hash, reset on mutation: an ItemSet is mutated while a
+    # state is being built but then used as a dict key many times
+    _hash: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
     def __hash__(self):
-        x = 0
-        for y in self.items:
-            x ^ hash(y)
-        return x
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items))
+        return self._hash
 
     def __iter__(self):
         return iter(self.items)
@@ -89,9 +76,11 @@ class ItemSet:
 
     def add(self, item: Item):
         self.items.add(item)
+        self._hash = None
 
     def remove(self, item: Item):
         self.items.remove(item)
+        self._hash = None
 
 
 @dataclass(frozen=True)
@@ -99,10 +88,7 @@ class CanonicalSet:
     s: set[ItemSet]
 
     def __hash__(self):
-        x = 0
-        for s in self.s:
-            x ^ hash(s)
-        return x
+        return hash(frozenset(self.s))
 
     def __contains__(self, items: ItemSet):
         return items in self.s
@@ -127,6 +113,91 @@ class ParsingTable:
     goto: dict[tuple[int, Symbol], Any]
 
 
+# cell layout of a compiled parsing table: the kind in the top bits,
+# the payload (target state or production index) in the low 30 bits
+_ERROR, _SHIFT, _REDUCE, _ACCEPT = 0, 1, 2, 3
+_KIND_BITS = 30
+_PAYLOAD_MASK = (1 << _KIND_BITS) - 1
+
+
+@dataclass
+class CompiledParsingTable:
+    """
+    A ParsingTable compiled down to flat integer arrays: looking up an
+    action is one index computation and one array read, instead of a
+    tuple-keyed dict lookup per parse step.
+
+    `action` is a len(states) x len(terminal_ids) row-major array whose
+    cells pack (kind, payload) as described above; `goto` is a
+    len(states) x len(non_terminal_ids) array of target states, -1 where
+    there is no transition. REDUCE payloads index into `productions`.
+    """
+    terminal_ids: dict[Terminal, int]
+    non_terminal_ids: dict[NonTerminal, int]
+    action: array
+    goto: array
+    productions: list
+
+    def action_at(self, state: int, terminal: Terminal):
+        """
+        The (action, target) entry for (state, terminal) in the same format
+        as ParsingTable.action, or None for an error cell.
+        """
+        cell = self.action[state * len(self.terminal_ids) + self.terminal_ids[terminal]]
+        kind = cell >> _KIND_BITS
+        if kind == _SHIFT:
+            return (SHIFT, cell & _PAYLOAD_MASK)
+        elif kind == _REDUCE:
+            return (REDUCE, self.productions[cell & _PAYLOAD_MASK])
+        elif kind == _ACCEPT:
+            return (ACCEPT, None)
+        else:
+            return None
+
+    def goto_at(self, state: int, non_terminal: NonTerminal) -> Optional[int]:
+        """
+        The GOTO target of (state, non_terminal), or None if there is none.
+        """
+        target = self.goto[state * len(self.non_terminal_ids)
+                           + self.non_terminal_ids[non_terminal]]
+        return target if target >= 0 else None
+
+
+def compile_parsing_table(pt: ParsingTable, G: Grammar) -> CompiledParsingTable:
+    """
+    Compile the constructed parsing table of grammar G into a
+    CompiledParsingTable backed by flat arrays.
+    """
+    terminal_ids = {t: i for i, t in enumerate(sorted(G.terminals() | {eof}))}
+    non_terminal_ids = {n: i for i, n in enumerate(sorted(G.non_terminals()))}
+
+    # unsigned: the packed REDUCE/ACCEPT cells exceed a signed 32-bit C
+    # long, which 'l' maps to on some platforms
+    ACTION = array('L', [_ERROR] * (len(pt.states) * len(terminal_ids)))
+    GOTO = array('l', [-1] * (len(pt.states) * len(non_terminal_ids)))
+
+    productions = []
+    production_ids = {}
+
+    for (state, t), (act, target) in pt.action.items():
+        if act == SHIFT:
+            cell = (_SHIFT << _KIND_BITS) | target
+        elif act == REDUCE:
+            if (key := (target.lhs, tuple(target.rhs))) not in production_ids:
+                production_ids[key] = len(productions)
+                productions.append(target)
+            cell = (_REDUCE << _KIND_BITS) | production_ids[key]
+        else:
+            cell = _ACCEPT << _KIND_BITS
+
+        ACTION[state * len(terminal_ids) + terminal_ids[t]] = cell
+
+    for (state, n), target in pt.goto.items():
+        GOTO[state * len(non_terminal_ids) + non_terminal_ids[n]] = target
+
+    return CompiledParsingTable(terminal_ids, non_terminal_ids, ACTION, GOTO, productions)
+
+
 def augmented_grammar(G: Grammar) -> Grammar:
     """
     return the augmented grammar.
@@ -141,12 +212,61 @@ def augmented_grammar(G: Grammar) -> Grammar:
     return G
 
 
+def fill_tables(G: Grammar, states: dict[int, ItemSet],
+                goto_target, reduce_lookaheads) -> tuple[dict, dict]:
+    """
+    Fill the ACTION/GOTO dicts of a ParsingTable — the part shared by the
+    SLR(1), canonical-LR(1) and LALR(1) constructions. The two callbacks
+    carry the per-algorithm differences:
+
+        goto_target(i, state, x): the index of the state reached from state
+            i on symbol x (x is guaranteed to have a transition).
+        reduce_lookaheads(item): the lookaheads on which to reduce by the
+            completed `item`.
+    """
+    ACTION = {}
+    GOTO = {}
+
+    # one Production per (lhs, rhs): a completed item always corresponds to a
+    # production of G, so REDUCE entries can share the grammar's own instance
+    # instead of allocating a copy per (state, lookahead)
+    reduce_productions = {(p.lhs, tuple(p.rhs)): p for p in G.productions}
+
+    for i, state in states.items():
+        # SHIFT and GOTO entries: only the symbols actually appearing after
+        # the • in this state can have a transition
+        for x in {after_dot(item) for item in state}:
+            if isinstance(x, Terminal):
+                ACTION[i, x] = (SHIFT, goto_target(i, state, x))
+            elif isinstance(x, NonTerminal):
+                GOTO[i, x] = goto_target(i, state, x)
+
+        for item in state:
+            if after_dot(item) is not None:
+                continue
+
+            if item.lhs == G.start_symbol:
+                # acceptable state: item = [S' -> S •]
+                ACTION[i, eof] = (ACCEPT, None)
+
+            else:
+                # • is at the end of this item, as B -> alpha •
+                if (p := reduce_productions.get((item.lhs, item.rhs))) is None:
+                    p = reduce_productions[item.lhs, item.rhs] = \
+                        Production(item.lhs, list(item.rhs))
+
+                action = (REDUCE, p)
+                for x in reduce_lookaheads(item):
+                    ACTION[i, x] = action
+
+    return ACTION, GOTO
+
+
 def after_dot(item: Item) -> Optional[Symbol]:
     """
     return the symbol after the • on rhs of the item, None if nothing after •.
     """
-    pos = item.rhs.index(dot)
-    if pos == len(item.rhs) - 1:
-        return None
+    if item.dot_pos < len(item.rhs):
+        return item.rhs[item.dot_pos]
     else:
-        return item.rhs[pos + 1]
+        return None
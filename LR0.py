@@ -1,43 +1,67 @@
 # utilities used in LR(0) parser.
-from .grammar import Grammar, Symbol, NonTerminal
-from copy import copy
-from .LR import CanonicalSet, Item, ItemSet, dot, after_dot
+from grammar import Grammar, Symbol, Terminal, NonTerminal
+from collections import defaultdict, deque
+from LR import CanonicalSet, Item, ItemSet, after_dot
 
 
 def closure(G: Grammar, C: ItemSet) -> ItemSet:
     """
     construct LR(0) closure for C.
+
+    C is consumed: the closure is expanded into it in place, so callers
+    wanting to keep the original item set must pass a copy.
     """
-    C = copy(C)
-    workset = list(C)
+    if (key := ('LR0.closure', frozenset(C.items))) in G._goto_cache:
+        return G._goto_cache[key]
+
+    # cores of the closure items added so far: duplicates are rejected on the
+    # core key alone, before an Item is even allocated
+    seen = {(item.lhs, item.rhs) for item in C.items if item.dot_pos == 0}
+
+    # bind the loop invariants to locals: attribute lookups add up in here
+    seen_add = seen.add
+    C_add = C.add
+    productions_from = G.productions_from
+
+    workset = deque(C.items)
+    workset_pop = workset.pop
+    workset_append = workset.append
+
     while len(workset) > 0:
-        item = workset.pop()
+        item = workset_pop()
         if isinstance(B := after_dot(item), NonTerminal):
-            for prod in G.productions_from(B):
-                new_item = Item(prod.lhs, [dot] + prod.rhs)
-                if new_item not in C.items:
-                    C.add(new_item)
-                    workset.append(new_item)
+            for prod in productions_from(B):
+                if (core := (prod.lhs, tuple(prod.rhs))) not in seen:
+                    seen_add(core)
+                    new_item = Item(*core)
+                    C_add(new_item)
+                    workset_append(new_item)
 
+    G._goto_cache[key] = C
     return C
 
 
 def goto(G: Grammar, C: ItemSet, x: Symbol) -> ItemSet:
     """
-    Compute GOTO(I, x)
+    Compute GOTO(I, x). C is expected to be closed already
+    (construct_canonical_set only ever produces closed item sets),
+    so it is not closed again here.
     """
+    if (key := ('LR0.goto', C, x)) in G._goto_cache:
+        return G._goto_cache[key]
+
     GOTO = ItemSet()
 
     # move the • right by one for all available transitions
-    for item in closure(G, C):
-        pos = item.rhs.index(dot)
-        if pos != len(item.rhs) - 1 and item.rhs[pos + 1] == x:
-            rhs = item.rhs[:pos] + [x, dot] + item.rhs[pos + 2:]
-            new_item = Item(item.lhs, rhs)
+    for item in C:
+        if after_dot(item) == x:
+            new_item = Item(item.lhs, item.rhs, item.dot_pos + 1)
             GOTO.add(new_item)
 
     # then compute the closure of the translated items
-    return closure(G, GOTO)
+    GOTO = closure(G, GOTO)
+    G._goto_cache[key] = GOTO
+    return GOTO
 
 
 def construct_canonical_set(G: Grammar) -> CanonicalSet:
@@ -48,18 +72,26 @@ def construct_canonical_set(G: Grammar) -> CanonicalSet:
     """
 
     # compute the CLOSURE({S' -> •S})
-    start_item = Item(G.start_symbol, [dot] +
-                      G.productions_from(G.start_symbol)[0].rhs)
+    start_item = Item(G.start_symbol,
+                      tuple(G.productions_from(G.start_symbol)[0].rhs))
     start = ItemSet({start_item})
     C = CanonicalSet({closure(G, start)})
 
-    symbols = G.non_terminals() | G.terminals()
     workset = list(C)
     while len(workset) > 0:
         items = workset.pop()
-        for symbol in symbols:
-            GOTO = goto(G, items, symbol)
-            if len(GOTO) != 0 and GOTO not in C:
+
+        # one pass over the state: bucket the advanced items by the symbol
+        # after the •, then close each bucket exactly once
+        kernels = defaultdict(set)
+        for item in items:
+            if isinstance(x := after_dot(item), (Terminal, NonTerminal)):
+                kernels[x].add(Item(item.lhs, item.rhs, item.dot_pos + 1))
+
+        for x, kernel in kernels.items():
+            GOTO = closure(G, ItemSet(kernel))
+            G._goto_cache['LR0.goto', items, x] = GOTO
+            if GOTO not in C:
                 C.add(GOTO)
                 workset.append(GOTO)
     return C
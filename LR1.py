@@ -1,28 +1,53 @@
-from grammar import Grammar, Production, Terminal, NonTerminal, Symbol, eof, first
-from LR import ParsingTable, Item, ItemSet, CanonicalSet, dot, after_dot, SHIFT, REDUCE, ACCEPT
-from copy import copy
+from grammar import Grammar, Terminal, NonTerminal, Symbol, eof, first
+from LR import ParsingTable, Item, ItemSet, CanonicalSet, after_dot, fill_tables
+from collections import defaultdict, deque
 
 
 def closure(G: Grammar, C: ItemSet) -> ItemSet:
     """
     compute LR(1) closure for C.
+
+    C is consumed: the closure is expanded into it in place, so callers
+    wanting to keep the original item set must pass a copy.
     """
-    C = copy(C)
-    workset = list(C)
+    if (key := ('LR1.closure', frozenset(C.items))) in G._goto_cache:
+        return G._goto_cache[key]
+
+    # cores of the closure items added so far: duplicates are rejected on the
+    # core key alone, before an Item is even allocated — items sharing B and
+    # beta generate mostly the same (B, rhs, lookahead) triples
+    seen = {(item.lhs, item.rhs, item.lookahead)
+            for item in C.items if item.dot_pos == 0}
+
+    # bind the loop invariants to locals: attribute lookups add up in here
+    seen_add = seen.add
+    C_add = C.add
+    productions_from = G.productions_from
+
+    workset = deque(C.items)
+    workset_pop = workset.pop
+    workset_append = workset.append
+
     while len(workset) > 0:
-        item = workset.pop()
+        item = workset_pop()
         if not isinstance(B := after_dot(item), NonTerminal):
             continue
 
         # item = [A -> alpha • B beta, lookahead]
-        beta = item.rhs[item.rhs.index(dot) + 2:]
-        for p in G.productions_from(B):
-            for b in first(beta + [item.lookahead], G):
-                new_item = Item(B, [dot] + p.rhs, b)
-                if new_item not in C:
-                    C.add(new_item)
-                    workset.append(new_item)
-
+        beta = item.rhs[item.dot_pos + 1:]
+        # FIRST(beta lookahead) does not depend on the production chosen
+        # (and is memoized on the grammar)
+        lookaheads = first(beta + (item.lookahead,), G)
+        for p in productions_from(B):
+            rhs = tuple(p.rhs)
+            for b in lookaheads:
+                if (core := (B, rhs, b)) not in seen:
+                    seen_add(core)
+                    new_item = Item(B, rhs, 0, b)
+                    C_add(new_item)
+                    workset_append(new_item)
+
+    G._goto_cache[key] = C
     return C
 
 
@@ -30,15 +55,18 @@ def goto(G: Grammar, C: ItemSet, x: Symbol):
     """
     compute LR(1) GOTO table for C.
     """
+    if (key := ('LR1.goto', C, x)) in G._goto_cache:
+        return G._goto_cache[key]
+
     GOTO = ItemSet()
     for item in C:
-        pos = item.rhs.index(dot)
-        if pos != len(item.rhs) - 1 and item.rhs[pos + 1] == x:
-            rhs = item.rhs[:pos] + [x, dot] + item.rhs[pos + 2:]
-            new_item = Item(item.lhs, rhs, item.lookahead)
+        if after_dot(item) == x:
+            new_item = Item(item.lhs, item.rhs, item.dot_pos + 1, item.lookahead)
             GOTO.add(new_item)
 
-    return closure(G, GOTO)
+    GOTO = closure(G, GOTO)
+    G._goto_cache[key] = GOTO
+    return GOTO
 
 
 def construct_canonical_set(G: Grammar) -> CanonicalSet:
@@ -48,17 +76,26 @@ def construct_canonical_set(G: Grammar) -> CanonicalSet:
 
     # compute the CLOSURE({[S' -> •S, $]})
     start_item = Item(
-        G.start_symbol, [dot] + G.productions_from(G.start_symbol)[0].rhs, eof)
+        G.start_symbol, tuple(G.productions_from(G.start_symbol)[0].rhs), 0, eof)
     start = ItemSet({start_item})
     C = CanonicalSet({closure(G, start)})
 
-    symbols = G.non_terminals() | G.terminals()
     workset = list(C)
     while len(workset) > 0:
         items = workset.pop()
-        for symbol in symbols:
-            GOTO = goto(G, items, symbol)
-            if len(GOTO) != 0 and GOTO not in C:
+
+        # one pass over the state: bucket the advanced items by the symbol
+        # after the •, then close each bucket exactly once
+        kernels = defaultdict(set)
+        for item in items:
+            if isinstance(x := after_dot(item), (Terminal, NonTerminal)):
+                kernels[x].add(
+                    Item(item.lhs, item.rhs, item.dot_pos + 1, item.lookahead))
+
+        for x, kernel in kernels.items():
+            GOTO = closure(G, ItemSet(kernel))
+            G._goto_cache['LR1.goto', items, x] = GOTO
+            if GOTO not in C:
                 C.add(GOTO)
                 workset.append(GOTO)
     return C
@@ -93,7 +130,7 @@ def construct_parsing_table(G: Grammar) -> ParsingTable:
     for state in C:
         start = False
         for item in state:
-            if item.lhs == G.start_symbol and item.rhs[0] == dot and item.lookahead == eof:
+            if item.lhs == G.start_symbol and item.dot_pos == 0 and item.lookahead == eof:
                 start = True
                 break
 
@@ -107,30 +144,11 @@ def construct_parsing_table(G: Grammar) -> ParsingTable:
 
     r_states = {v: k for k, v in states.items()}
 
-    # start filling in the parsing table
-    ACTION = {}
-    GOTO = {}
-
-    for i, state in states.items():
-        for item in state:
-            A = after_dot(item)
-            if isinstance(A, Terminal):
-                # the symbol after • is a terminal
-                ACTION[i, A] = (SHIFT, r_states[goto(G, state, A)])
-
-            elif A is None and item.lhs == G.start_symbol and item.rhs[-1] == dot and item.lookahead == eof:
-                # acceptable state: item = [S' -> S •, $]
-                ACTION[i, eof] = (ACCEPT, None)
-
-            elif A is None and item.lhs != G.start_symbol:
-                # • is at the end of this item, as
-                # B -> alpha •
-                action = (REDUCE, Production(item.lhs, item.rhs[:-1]))
-                ACTION[i, item.lookahead] = action
-
-        # construct GOTO[i, n] for all non-terminals n
-        for n in G.non_terminals():
-            if len(s := goto(G, state, n)) > 0:
-                GOTO[i, n] = r_states[s]
+    # start filling in the parsing table;
+    # a canonical-LR(1) item reduces exactly on its own lookahead
+    ACTION, GOTO = fill_tables(
+        G, states,
+        goto_target=lambda i, state, x: r_states[goto(G, state, x)],
+        reduce_lookaheads=lambda item: (item.lookahead,))
 
     return ParsingTable(states, ACTION, GOTO)
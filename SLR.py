@@ -1,6 +1,6 @@
 from LR0 import construct_canonical_set, goto
-from LR import ParsingTable, dot, after_dot, SHIFT, REDUCE, ACCEPT
-from grammar import Grammar, Terminal, Production, eof, follow
+from LR import ParsingTable, fill_tables
+from grammar import Grammar, follow
 
 
 # TODO: message error on conflicting
@@ -30,7 +30,7 @@ def construct_parsing_table(G: Grammar) -> ParsingTable:
     states = {}
     for state in C:
         for item in state:
-            if item.lhs == G.start_symbol and item.rhs[0] == dot:
+            if item.lhs == G.start_symbol and item.dot_pos == 0:
                 # this item is starting state
                 states[0] = state
                 break
@@ -41,31 +41,11 @@ def construct_parsing_table(G: Grammar) -> ParsingTable:
 
     r_states = {v: k for k, v in states.items()}
 
-    # start filling in the parsing table
-    ACTION = {}
-    GOTO = {}
-
-    for i, state in states.items():
-        for item in state:
-            A = after_dot(item)
-            if isinstance(A, Terminal):
-                # the symbol after • is a terminal
-                ACTION[i, A] = (SHIFT, r_states[goto(G, state, A)])
-
-            elif A is None and item.lhs == G.start_symbol:
-                # acceptable state: S' -> S •
-                ACTION[i, eof] = (ACCEPT, None)
-
-            elif A is None:
-                # • is at the end of this item, as
-                # B -> X Y ... •
-                action = (REDUCE, Production(item.lhs, item.rhs[:-1]))
-                for x in follow(item.lhs, G):
-                    ACTION[i, x] = action
-
-        # construct GOTO[i, n] for all non-terminals n
-        for n in G.non_terminals():
-            if len(s := goto(G, state, n)) > 0:
-                GOTO[i, n] = r_states[s]
+    # start filling in the parsing table;
+    # SLR(1) reduces on the FOLLOW set of the completed item's lhs
+    ACTION, GOTO = fill_tables(
+        G, states,
+        goto_target=lambda i, state, x: r_states[goto(G, state, x)],
+        reduce_lookaheads=lambda item: follow(item.lhs, G))
 
     return ParsingTable(states, ACTION, GOTO)
@@ -1,7 +1,8 @@
 # define core utilities for syntax analysis
 
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
-from typing import Union, Iterable
+from typing import Optional, Union, Iterable
 
 
 @dataclass(order=True, frozen=True)
@@ -9,6 +10,24 @@ class Terminal:
     symbol: str
     eof: bool = False
 
+    def __post_init__(self):
+        # symbols are hashed constantly from inside item sets, so cache the
+        # hash instead of walking the fields on every call
+        object.__setattr__(self, '_hash', hash((self.__class__, self.symbol, self.eof)))
+
+    def __hash__(self):
+        return self._hash
+
+    # the cached hash only holds within one process (str hashing is
+    # randomized per run), so drop it when pickling and recompute on load
+    def __getstate__(self):
+        return (self.symbol, self.eof)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, 'symbol', state[0])
+        object.__setattr__(self, 'eof', state[1])
+        self.__post_init__()
+
     def __repr__(self):
         return self.symbol
 
@@ -18,6 +37,22 @@ class NonTerminal:
     symbol: str
     id: int = 0  # For auto naming when automatic generating new non-terminal
 
+    def __post_init__(self):
+        # cache the hash, as in Terminal
+        object.__setattr__(self, '_hash', hash((self.__class__, self.symbol, self.id)))
+
+    def __hash__(self):
+        return self._hash
+
+    # recompute the cached hash on unpickling, as in Terminal
+    def __getstate__(self):
+        return (self.symbol, self.id)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, 'symbol', state[0])
+        object.__setattr__(self, 'id', state[1])
+        self.__post_init__()
+
     def __repr__(self):
         if self.id == 0:
             return self.symbol
@@ -67,11 +102,7 @@ class Production:
 
     # let it hashable for more utilizable
     def __hash__(self):
-        x = hash(self.lhs)
-        for y in self.rhs:
-            x ^= hash(y)
-
-        return x
+        return hash((self.lhs, tuple(self.rhs)))
 
     def __eq__(self, other):
         return self.lhs == other.lhs and self.rhs == other.rhs
@@ -88,45 +119,114 @@ class Grammar:
     start_symbol: NonTerminal = None
     productions: list[Production] = field(default_factory=list)
 
+    # memoized results of first() and follow(), keyed on the argument.
+    # recomputing them from scratch on every call is the dominant cost of
+    # closure construction in the LR(1)/LALR(1) table build.
+    _first_cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _follow_cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # memoized closure()/goto() results of the LR modules, also keyed on the
+    # argument: the same (state, symbol) GOTO is recomputed by
+    # construct_canonical_set and again by every table-fill loop
+    _goto_cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # lazily built indexes over self.productions: productions keyed by their
+    # left-hand-side, and the non-terminal/terminal sets — all of them are
+    # queried from every closure, FIRST and FOLLOW expansion
+    _by_lhs: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _non_terminals: Optional[set] = field(default=None, init=False, repr=False, compare=False)
+    _terminals: Optional[set] = field(default=None, init=False, repr=False, compare=False)
+    _production_set: Optional[set] = field(default=None, init=False, repr=False, compare=False)
+
+    # bit position of every terminal (and epsilon, eof) and the FIRST/FOLLOW
+    # sets of every non-terminal as int bitmasks, computed lazily: first() and
+    # follow() work bit-parallel internally and decode to sets on demand
+    _symbol_bits: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _first_masks: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _follow_masks: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
     def add_production(self, n: NonTerminal, s: list[Symbol]):
         p = Production(n, s)
-        if p in self.productions:
+        if self._production_set is None:
+            self._production_set = set(self.productions)
+
+        if p in self._production_set:
             raise ValueError('production already exists')
 
-        self.productions.append(Production(n, s))
+        self.productions.append(p)
+
+        # keep the cheap indexes in sync instead of rebuilding them;
+        # only the derived analysis caches have to be dropped
+        self._production_set.add(p)
+        if self._by_lhs:
+            self._by_lhs.setdefault(n, []).append(p)
+        if self._non_terminals is not None:
+            self._non_terminals.add(n)
+        if self._terminals is not None:
+            self._terminals.update(x for x in s if isinstance(x, Terminal))
+
+        self._invalidate_analysis_caches()
+
+    def invalidate_caches(self):
+        """
+        Drop all memoized results and indexes.
+        Must be called whenever `self.productions` is mutated directly.
+        """
+        self._invalidate_analysis_caches()
+        self._by_lhs.clear()
+        self._non_terminals = None
+        self._terminals = None
+        self._production_set = None
+
+    def _invalidate_analysis_caches(self):
+        # the first()/follow()/goto() memoizations and the bitmask tables
+        self._first_cache.clear()
+        self._follow_cache.clear()
+        self._goto_cache.clear()
+        self._symbol_bits.clear()
+        self._first_masks.clear()
+        self._follow_masks.clear()
 
     def non_terminals(self) -> set[NonTerminal]:
         """
         Return a set of all non-terminals in this grammar.
         """
-        N = set()
-        for p in self.productions:
-            N.add(p.lhs)
+        if self._non_terminals is None:
+            self._non_terminals = {p.lhs for p in self.productions}
 
-        return N
+        return self._non_terminals
 
     def terminals(self) -> set[Terminal]:
         """
         Return a set of all terminals in this grammar.
         """
-        T = set()
-        for p in self.productions:
-            for symbol in p.rhs:
-                if isinstance(symbol, Terminal):
-                    T.add(symbol)
+        if self._terminals is None:
+            self._terminals = {symbol for p in self.productions
+                               for symbol in p.rhs if isinstance(symbol, Terminal)}
+
+        return self._terminals
+
+    def compute_first_sets(self) -> dict[NonTerminal, set]:
+        """
+        Return the FIRST set of every non-terminal of this grammar at once.
+        """
+        return {n: first(n, self) for n in self.non_terminals()}
 
-        return T
+    def compute_follow_sets(self) -> dict[NonTerminal, set]:
+        """
+        Return the FOLLOW set of every non-terminal of this grammar at once.
+        """
+        return {n: follow(n, self) for n in self.non_terminals()}
 
     def productions_from(self, lhs: NonTerminal) -> list[Production]:
         """
         return all productions in this grammar where left-hand-side is `lhs`.
         """
-        P = []
-        for p in self.productions:
-            if p.lhs == lhs:
-                P.append(p)
+        if not self._by_lhs:
+            for p in self.productions:
+                self._by_lhs.setdefault(p.lhs, []).append(p)
 
-        return P
+        return self._by_lhs.get(lhs, [])
 
     def __copy__(self):
         return Grammar(self.start_symbol, self.productions.copy())
@@ -146,76 +246,141 @@ def non_terminals(*names) -> list[NonTerminal]:
     return [NonTerminal(name) for name in names]
 
 
-def first(s: Union[Iterable, Epsilon, Terminal, NonTerminal], G: Grammar) -> set[Union[Terminal, Epsilon]]:
-    callstack = []  # to avoid infinite recursive call
-
-    def _first(s):
-        if s in callstack:
-            return set()
-
-        callstack.append(s)
-
-        if isinstance(s, (Epsilon, Terminal)):
-            S = {s}
-        elif isinstance(s, NonTerminal):
-            # s is non-terminal, all productions having the pattern
-            # s -> a b c ... implies First(a b c ...) in First(s)
-            S = set()
-            for p in G.productions_from(s):
-                S |= _first(p.rhs)
-        elif isinstance(s, Iterable):
-            # s is a sequence of symbols: s = [a b c ...]
-            S = set()
-            for q in s:
-                firsts = _first(q)
-                S |= firsts
-                if epsilon not in firsts:
-                    break
+def _first_key(s):
+    # sequences are keyed on an equivalent tuple so they are hashable
+    return tuple(s) if isinstance(s, (list, tuple)) else s
 
-        else:
-            return TypeError('bad arguments when calling function first:', s)
 
-        callstack.pop()
-        return S
+def _terminal_bit(s: Union[Epsilon, Terminal], G: Grammar) -> int:
+    """
+    Return the bitmask with only the bit of `s` set, assigning bit positions
+    lazily (epsilon always gets bit 0).
+    """
+    bits = G._symbol_bits
+    if not bits:
+        bits[epsilon] = 1
+        for t in sorted(G.terminals() | {eof}):
+            bits[t] = 1 << len(bits)
+
+    if s not in bits:
+        # a terminal outside the grammar (e.g. LALR1's probe lookahead)
+        bits[s] = 1 << len(bits)
 
-    return _first(s)
+    return bits[s]
 
 
-def follow(s: NonTerminal, G: Grammar) -> set[Terminal]:
+def _decode_bits(mask: int, G: Grammar) -> set:
+    return {s for s, bit in G._symbol_bits.items() if mask & bit}
+
+
+def _first_bitmasks(G: Grammar) -> dict[NonTerminal, int]:
     """
-    Compute the FOLLOW set of a non-terminal
+    Compute the FIRST set of every non-terminal at once as int bitmasks,
+    by a bit-parallel fixed point over the productions: each union of
+    terminal sets is a single integer OR.
+    """
+    if G._first_masks:
+        return G._first_masks
+
+    masks = {n: 0 for n in G.non_terminals()}
+
+    changed = True
+    while changed:
+        changed = False
+        for p in G.productions:
+            new = masks[p.lhs] | _sequence_first_bitmask(p.rhs, G, masks)
+            if new != masks[p.lhs]:
+                masks[p.lhs] = new
+                changed = True
+
+    G._first_masks.update(masks)
+    return G._first_masks
+
+
+def _sequence_first_bitmask(s: Iterable, G: Grammar, masks: dict) -> int:
     """
+    The FIRST bitmask of a sequence of symbols s = [a b c ...],
+    given the FIRST bitmasks of the non-terminals.
+    """
+    S = 0
+    for q in s:
+        if isinstance(q, NonTerminal):
+            firsts = masks.get(q, 0)
+        else:
+            firsts = _terminal_bit(q, G)
+
+        S |= firsts
+        if not (firsts & 1):  # epsilon is bit 0
+            break
+
+    return S
+
+
+def first(s: Union[Iterable, Epsilon, Terminal, NonTerminal], G: Grammar) -> set[Union[Terminal, Epsilon]]:
+    key = _first_key(s)
+    if key in G._first_cache:
+        return G._first_cache[key]
+
+    if isinstance(s, (Epsilon, Terminal)):
+        S = {s}
+    elif isinstance(s, NonTerminal):
+        S = _decode_bits(_first_bitmasks(G).get(s, 0), G)
+    elif isinstance(s, Iterable):
+        S = _decode_bits(_sequence_first_bitmask(s, G, _first_bitmasks(G)), G)
+    else:
+        raise TypeError('bad arguments when calling function first:', s)
 
-    # to avoid infinite recursive call
-    callstack = []
+    G._first_cache[key] = S
+    return S
 
-    def _follow(s: NonTerminal):
-        if s in callstack:
-            return set()
 
-        callstack.append(s)
+def _follow_bitmasks(G: Grammar) -> dict[NonTerminal, int]:
+    """
+    Compute the FOLLOW set of every non-terminal at once as int bitmasks,
+    by the same bit-parallel fixed point as _first_bitmasks.
+    """
+    if G._follow_masks:
+        return G._follow_masks
 
-        S = set()
-        if s is G.start_symbol:
-            S.add(eof)
+    first_masks = _first_bitmasks(G)
+    masks = {n: 0 for n in G.non_terminals()}
+    if G.start_symbol in masks:
+        masks[G.start_symbol] |= _terminal_bit(eof, G)
 
+    changed = True
+    while changed:
+        changed = False
         for p in G.productions:
             for i, e in enumerate(p.rhs):
-                if e != s:
+                if not isinstance(e, NonTerminal):
                     continue
 
-                S |= first(p.rhs[i + 1:], G) - {epsilon}
-                if i == len(p.rhs) - 1:
-                    # A -> B s, add Follow(A) to Follow(S)
-                    S |= _follow(p.lhs)
-                elif epsilon in first(p.rhs[i + 1:], G):
-                    # A -> B s C where epsilon in First(C), add Follow(A) to Follow(s)
-                    S |= _follow(p.lhs)
+                # A -> alpha e beta: First(beta) - epsilon is in Follow(e),
+                # and Follow(A) is in Follow(e) when beta can derive epsilon
+                firsts = _sequence_first_bitmask(p.rhs[i + 1:], G, first_masks)
+                new = masks.get(e, 0) | (firsts & ~1)
+                if i == len(p.rhs) - 1 or (firsts & 1):
+                    new |= masks[p.lhs]
+
+                if new != masks.get(e, 0):
+                    masks[e] = new
+                    changed = True
+
+    G._follow_masks.update(masks)
+    return G._follow_masks
+
+
+def follow(s: NonTerminal, G: Grammar) -> set[Terminal]:
+    """
+    Compute the FOLLOW set of a non-terminal
+    """
 
-        callstack.remove(s)
-        return S
+    if s in G._follow_cache:
+        return G._follow_cache[s]
 
-    return _follow(s)
+    S = _decode_bits(_follow_bitmasks(G).get(s, 0), G)
+    G._follow_cache[s] = S
+    return S
 
 
 def left_recursion_eliminated(G: Grammar):
@@ -237,6 +402,7 @@ def left_recursion_eliminated(G: Grammar):
                 new_productions.append(p)
 
         G.productions = new_productions
+        G.invalidate_caches()
 
     # Converts all indirect left recursions to direct left recursions
     for i in range(len(A)):
@@ -265,8 +431,9 @@ def left_recursion_eliminated(G: Grammar):
     for n in new_nonterminals:
         new_productions += [Production(n, [epsilon])]
 
-    # eliminate repeated productions
-    G.productions = list(set(new_productions))
+    # eliminate repeated productions (preserving order, for reproducibility)
+    G.productions = list(dict.fromkeys(new_productions))
+    G.invalidate_caches()
     return G
 
 
@@ -276,6 +443,12 @@ def left_factored(G: Grammar) -> Grammar:
     """
     G = G.__copy__()
 
+    # productions indexed by their left-hand-side, kept up to date below so
+    # the factoring loop never rescans the whole production list
+    by_lhs: dict[NonTerminal, list[Production]] = defaultdict(list)
+    for p in G.productions:
+        by_lhs[p.lhs].append(p)
+
     def longest_common_prefix(a: list[Symbol], b: list[Symbol]) -> list[Symbol]:
         prefix = []
         for sa, sb in zip(a, b):
@@ -286,11 +459,11 @@ def left_factored(G: Grammar) -> Grammar:
 
         return prefix
 
-    def left_factor_one_symbol(n: NonTerminal) -> bool:
-        # factor out all the productions of left-hand-side `n`
-        # return value indicates something changed
+    def left_factor_one_symbol(n: NonTerminal) -> Optional[NonTerminal]:
+        # factor out one common prefix of the productions of left-hand-side
+        # `n`, returning the generated non-terminal if something changed
 
-        n_productions = G.productions_from(n)
+        n_productions = list(by_lhs[n])
         for i in range(len(n_productions)):
             # the production rhs to find common prefix
             key = n_productions[i].rhs
@@ -311,22 +484,34 @@ def left_factored(G: Grammar) -> Grammar:
             if len(groups) > 1:
                 new_lhs = n.new(G)
                 prefix = key[:min_prefix]
-                G.productions += [Production(n, prefix + [new_lhs])]
+                factored = Production(n, prefix + [new_lhs])
+                G.productions += [factored]
+                by_lhs[n].append(factored)
 
                 # add production rules: new_lhs -> suffixes
                 for k in groups:
                     # if suffix is empty, allow the rule: new_lhs -> epsilon
                     suffix = n_productions[k].rhs[min_prefix:] or [epsilon]
                     G.productions.remove(n_productions[k])
-                    G.productions += [Production(new_lhs, suffix)]
-
-                # found one, good enough (fixed point algorithm)
-                return True
-
-        return False
-
-    # fixed point algorithm, continue until nothing can progress
-    while any(left_factor_one_symbol(n) for n in G.non_terminals()):
-        continue
+                    by_lhs[n].remove(n_productions[k])
+                    q = Production(new_lhs, suffix)
+                    G.productions += [q]
+                    by_lhs[new_lhs].append(q)
+
+                # found one, good enough
+                # (the productions were mutated directly, so the grammar's
+                #  own indexes have to be dropped)
+                G.invalidate_caches()
+                return new_lhs
+
+        return None
+
+    # fixed point algorithm: only the two non-terminals whose productions
+    # just changed can possibly need factoring again
+    worklist = deque(G.non_terminals())
+    while worklist:
+        n = worklist.popleft()
+        if (new_lhs := left_factor_one_symbol(n)) is not None:
+            worklist += [n, new_lhs]
 
     return G
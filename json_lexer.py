@@ -1,8 +1,29 @@
+import re
 from collections.abc import Iterator
 from dataclasses import dataclass
 from enum import Enum
 from typing import Union
-from string import whitespace, hexdigits, digits
+
+
+# value of each hex digit indexed by code point, -1 for non-hex-digits:
+# decoding \uXXXX is then four table loads and one OR to validate
+_HEX_VAL = [-1] * 256
+for _i, _c in enumerate('0123456789abcdef'):
+    _HEX_VAL[ord(_c)] = _i
+    _HEX_VAL[ord(_c.upper())] = _i
+
+
+# the only whitespace characters JSON allows; matching a whole run at once
+# keeps the scan inside the regex engine instead of stepping per character
+_WS_RE = re.compile(r'[ \t\n\r]+')
+
+# a JSON number; one match finds the whole span, and the matched slice is
+# handed to float() in one go instead of being built up per digit
+_NUM_RE = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+
+# a run of literal string characters (up to the next escape or closing
+# quote), copied as one slice in next_string's escape path
+_STR_RUN_RE = re.compile(r'[^"\\]+')
 
 
 class JsonType(Enum):
@@ -19,12 +40,42 @@ class JsonType(Enum):
     COLON = ':'
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class JsonToken:
     type: JsonType
     value: Union[bool, float, str, None]
 
 
+# one alternation matching any JSON token (or a whitespace run): tokens()
+# then runs as a single finditer loop inside the regex engine instead of a
+# Python-level dispatch per character
+_TOKEN_RE = re.compile(
+    r'(?P<WS>[ \t\n\r]+)'
+    r'|(?P<STRING>"(?:[^"\\]|\\.)*")'
+    r'|(?P<NUMBER>-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+    r'|(?P<KEYWORD>true|false|null)'
+    r'|(?P<PUNCTUATION>[][{}:,])'
+)
+
+# keyword and punctuation tokens always carry the same (type, value) pair,
+# so one interned instance each is yielded instead of a fresh allocation
+# per occurrence (JsonToken is frozen, sharing is safe)
+_KEYWORD_TOKENS = {
+    'true': JsonToken(JsonType.TRUE, True),
+    'false': JsonToken(JsonType.FALSE, False),
+    'null': JsonToken(JsonType.NULL, None),
+}
+
+_PUNCTUATION_TOKENS = {
+    '[': JsonToken(JsonType.LEFT_SQUARE_BRACKET, '['),
+    ']': JsonToken(JsonType.RIGHT_SQUARE_BRACKET, ']'),
+    '{': JsonToken(JsonType.LEFT_CURLY_BRACKET, '{'),
+    '}': JsonToken(JsonType.RIGHT_CURLY_BRACKET, '}'),
+    ',': JsonToken(JsonType.COMMA, ','),
+    ':': JsonToken(JsonType.COLON, ':'),
+}
+
+
 class JsonLexer:
     def __init__(self, stream: str):
         # The json element string
@@ -52,8 +103,8 @@ class JsonLexer:
         """
         Advance self.head until next non-whitespace character, or eof
         """
-        while self.head < len(self.stream) and self.peek() in whitespace:
-            self.advance(1)
+        if (m := _WS_RE.match(self.stream, self.head)) is not None:
+            self.head = m.end()
 
     def expect_literal(self, literal: str):
         """
@@ -77,114 +128,129 @@ class JsonLexer:
         Advance self.head through next json string, and return the content of the json string
         """
         self.expect_literal('"')
-        characters = []
-        while self.head < len(self.stream) and self.peek() != '"':
-            # Found escape
-            if self.peek() == '\\':
-                # skip \
-                self.advance(1)
-                c = self.next_char()
-                match c:
-                    case '"' | '\\' | '/':
-                        characters.append(c)
-                    case 'b':
-                        characters.append('\b')
-                    case 'f':
-                        characters.append('\f')
-                    case 'n':
-                        characters.append('\n')
-                    case 'r':
-                        characters.append('\r')
-                    case 't':
-                        characters.append('\t')
-                    case 'u':
-                        h1 = self.next_char()
-                        h2 = self.next_char()
-                        h3 = self.next_char()
-                        h4 = self.next_char()
-                        if any(h not in hexdigits for h in (h1, h2, h3, h4)):
-                            raise RuntimeError(f'Invalid hex digits \\u{h1}{h2}{h3}{h4}')
-
-                        characters.append(chr(int(f'{h1}{h2}{h3}{h4}', 16)))
-            else:
-                characters.append(self.next_char())
 
+        # fast path: most strings contain no escape, so find the closing
+        # quote in one C-level scan — if no backslash occurs before it, the
+        # content is exactly the slice in between
+        s = self.stream
+        start = self.head
+        end = s.find('"', start)
+        if end != -1 and s.find('\\', start, end) == -1:
+            self.head = end + 1
+            return s[start:end]
+
+        # slow path: walk the string and process the escapes. The stream
+        # and head are kept in locals for the whole walk — the peek/advance
+        # helpers cost a Python call each, which adds up at one call per
+        # character
+        n = len(s)
+        h = start
+        parts = []
+        append = parts.append
+        while h < n and s[h] != '"':
+            if s[h] != '\\':
+                # a literal run: copy it in one slice instead of one
+                # append per character
+                run = _STR_RUN_RE.match(s, h)
+                append(run.group())
+                h = run.end()
+                continue
+
+            # found escape, skip the \
+            h += 1
+            if h >= n:
+                raise RuntimeError('Peek at end of file')
+
+            c = s[h]
+            h += 1
+            match c:
+                case '"' | '\\' | '/':
+                    append(c)
+                case 'b':
+                    append('\b')
+                case 'f':
+                    append('\f')
+                case 'n':
+                    append('\n')
+                case 'r':
+                    append('\r')
+                case 't':
+                    append('\t')
+                case 'u':
+                    try:
+                        d0 = _HEX_VAL[ord(s[h])]
+                        d1 = _HEX_VAL[ord(s[h + 1])]
+                        d2 = _HEX_VAL[ord(s[h + 2])]
+                        d3 = _HEX_VAL[ord(s[h + 3])]
+                    except IndexError:
+                        raise RuntimeError(f'Invalid hex digits \\u{s[h:h + 4]}')
+
+                    # any -1 makes the OR negative
+                    if d0 | d1 | d2 | d3 < 0:
+                        raise RuntimeError(f'Invalid hex digits \\u{s[h:h + 4]}')
+
+                    append(chr(d0 << 12 | d1 << 8 | d2 << 4 | d3))
+                    h += 4
+
+        self.head = h
         self.expect_literal('"')
-        return ''.join(characters)
+        return ''.join(parts)
 
     def next_number(self) -> float:
         # We'll use python float() function to convert string to float for simplicity
-        number_str = ""
+        m = _NUM_RE.match(self.stream, self.head)
+        if m is None:
+            raise RuntimeError('Cannot parse number')
 
-        if self.peek() == '-':
-            number_str += self.next_char()
+        self.head = m.end()
+        return float(m.group())
 
-        while self.head < len(self.stream) and self.peek() in digits:
-            number_str += self.next_char()
-
-        if self.head < len(self.stream) and self.peek() == '.':
-            number_str += '.'
-            self.advance(1)
-
-        while self.head < len(self.stream) and self.peek() in digits:
-            number_str += self.next_char()
-
-        if self.head < len(self.stream) and (self.peek() == 'E' or self.peek() == 'e'):
-            number_str += self.next_char()
+    def tokenize(self) -> list[JsonToken]:
+        """
+        Perform the lexing, return the tokens as a list
+        """
 
-        if self.head < len(self.stream) and (self.peek() == '-' or self.peek() == '+'):
-            number_str += self.next_char()
+        stream = self.stream
+        out = []
+        append = out.append
+        pos = 0
+        for m in _TOKEN_RE.finditer(stream):
+            if m.start() != pos:
+                raise RuntimeError(f'Unexpected character "{stream[pos]}"')
+
+            pos = m.end()
+            kind = m.lastgroup
+            if kind == 'WS':
+                continue
+            elif kind == 'STRING':
+                # slice the content straight out of the stream: going
+                # through m.group() would allocate the quoted lexeme only
+                # to slice the quotes off it again
+                value = stream[m.start() + 1:pos - 1]
+                if '\\' in value:
+                    # take the escape-processing path of next_string
+                    self.head = m.start()
+                    value = self.next_string()
+                append(JsonToken(JsonType.STRING, value))
+            elif kind == 'NUMBER':
+                append(JsonToken(JsonType.NUMBER, float(m.group())))
+            elif kind == 'KEYWORD':
+                append(_KEYWORD_TOKENS[m.group()])
+            else:
+                append(_PUNCTUATION_TOKENS[m.group()])
 
-        while self.head < len(self.stream) and self.peek() in digits:
-            number_str += self.next_char()
+        if pos != len(stream):
+            raise RuntimeError(f'Unexpected character "{stream[pos]}"')
 
-        return float(number_str)
+        self.head = pos
+        return out
 
     def tokens(self) -> Iterator[JsonToken]:
         """
         Perform the lexing, yields the iterators of token
+        (a thin wrapper over tokenize for callers expecting an iterator)
         """
-
-        self.skip_ws()
-        while self.head < len(self.stream):
-            match self.peek():
-                case 't':
-                    self.expect_literal('true')
-                    yield JsonToken(JsonType.TRUE, True)
-                case 'f':
-                    self.expect_literal('false')
-                    yield JsonToken(JsonType.TRUE, False)
-                case 'n':
-                    self.expect_literal('null')
-                    yield JsonToken(JsonType.NULL, None)
-                case '0' | '1' | '2' | '3' | '4' | '5' | '6' | '7' | '8' | '9' | '-':
-                    value = self.next_number()
-                    yield JsonToken(JsonType.NUMBER, value)
-                case '"':
-                    value = self.next_string()
-                    yield JsonToken(JsonType.STRING, value)
-                case '{':
-                    self.advance(1)
-                    yield JsonToken(JsonType.LEFT_CURLY_BRACKET, '{')
-                case '}':
-                    self.advance(1)
-                    yield JsonToken(JsonType.RIGHT_CURLY_BRACKET, '}')
-                case '[':
-                    self.advance(1)
-                    yield JsonToken(JsonType.LEFT_SQUARE_BRACKET, '[')
-                case ']':
-                    self.advance(1)
-                    yield JsonToken(JsonType.RIGHT_SQUARE_BRACKET, ']')
-                case ',':
-                    self.advance(1)
-                    yield JsonToken(JsonType.COMMA, ',')
-                case ':':
-                    self.advance(1)
-                    yield JsonToken(JsonType.COLON, ':')
-                case c:
-                    raise RuntimeError(f'Unexpected character "{c}"')
-
-            self.skip_ws()
+        return iter(self.tokenize())
 
 
 #  json_str = """
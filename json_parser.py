@@ -1,10 +1,12 @@
 import json
+import pickle
+from io import StringIO
 from pprint import pprint
 from collections import deque
 from typing import Union
 from pathlib import Path
 
-from json_lexer import JsonLexer, JsonToken
+from json_lexer import JsonLexer, JsonToken, JsonType
 import grammar
 from grammar import Epsilon, Grammar, NonTerminal, Production, Terminal
 import LL1
@@ -61,6 +63,10 @@ rcb = Terminal('}')  # Right curly bracket
 comma = Terminal(',')
 colon = Terminal(':')
 
+# the grammar terminal of each token type, interned once: the translation
+# used to construct (and hash) a fresh Terminal per lookahead inspection
+_TERMINAL_BY_JSONTYPE = {jt: Terminal(jt.value) for jt in JsonType}
+
 
 def build_json_grammar() -> Grammar:
     json_grammar = Grammar(Value)
@@ -95,44 +101,79 @@ def build_json_grammar() -> Grammar:
 
 
 class ParseTreeNode:
+    # no __dict__ per node: a big document allocates one node per grammar
+    # symbol, so the fixed slot layout saves most of the per-node memory
+    __slots__ = ('non_terminal', 'children')
+
     def __init__(self, non_terminal: NonTerminal, children: list[Union[JsonToken, 'ParseTreeNode']], inh=None, syn=None):
         self.non_terminal = non_terminal
         self.children = children
 
-    def as_graphviz(self, node2name) -> str:
-        # BFS
+    def as_graphviz(self) -> str:
+        # BFS, writing each line straight into one buffer
         queue = deque([self])
+        popleft = queue.popleft
+        enqueue = queue.append
         node2name = {self: 'n0'}
-        name_index = 1
-        lines = ['graph "" {']
-        lines.append('node [shape=rectangle]')
-        while len(queue) > 0:
-            node = queue.popleft()
-            lines.append(f'    {node2name[node]} [label="{node.non_terminal}"]')
+
+        # separate counters for terminal (t...) and non-terminal (n...)
+        # nodes, so both numberings are dense
+        t_i = 0
+        nt_i = 1
+
+        buf = StringIO()
+        w = buf.write
+        w('graph "" {\n')
+        w('node [shape=rectangle]\n')
+        while queue:
+            node = popleft()
+            name = node2name[node]
+            w(f'    {name} [label="{node.non_terminal}"]\n')
             for child in node.children:
                 if isinstance(child, JsonToken):
-                    name = f't{name_index}'
-                    name_index += 1
-                    lines.append(f'    {name} [label="{child.value}"]')
-                    lines.append(f'    {node2name[node]} -- {name}')
+                    w(f'    t{t_i} [label="{child.value}"]\n')
+                    w(f'    {name} -- t{t_i}\n')
+                    t_i += 1
                 else:
-                    if child not in node2name:
-                        node2name[child] = f'n{name_index}'
-                        name_index += 1
+                    # one .get instead of a membership test, an insert and
+                    # a lookup on the same key
+                    child_name = node2name.get(child)
+                    if child_name is None:
+                        child_name = f'n{nt_i}'
+                        node2name[child] = child_name
+                        nt_i += 1
 
-                    lines.append(f'    {node2name[node]} -- {node2name[child]}')
-                    queue.append(child)
-            lines.append('')
+                    w(f'    {name} -- {child_name}\n')
+                    enqueue(child)
+            w('\n')
 
-        lines.append('}')
-        return '\n'.join(lines)
+        w('}')
+        return buf.getvalue()
 
 
-def create_parse_tree(stream: str, grammar: Grammar, parsing_table: dict[tuple[NonTerminal, Terminal], set[Production]]):
+def create_parse_tree(tokens: list[JsonToken], grammar: Grammar, parsing_table: dict[tuple[NonTerminal, Terminal], set[Production]]):
     root = ParseTreeNode(grammar.start_symbol, [])
-    tokens = list(JsonLexer(stream).tokens())
     token_i = 0
 
+    # flatten the parsing table into a row-major list indexed by small
+    # integer ids — row per non-terminal, column per terminal — so a parse
+    # step is one list index instead of hashing a (NonTerminal, Terminal)
+    # key. Each cell holds the rhs with every symbol pre-classified, its
+    # row offset precomputed, and epsilons dropped.
+    nt_ids = {nt: i for i, nt in enumerate(grammar.non_terminals())}
+    term_ids = {}
+    for _, term in parsing_table:
+        term_ids.setdefault(term.symbol, len(term_ids))
+
+    num_terms = len(term_ids)
+    table = [None] * (len(nt_ids) * num_terms)
+    for (nt, term), productions in parsing_table.items():
+        rhs = next(iter(productions)).rhs
+        table[nt_ids[nt] * num_terms + term_ids[term.symbol]] = tuple(
+            (isinstance(symbol, Terminal), symbol,
+             nt_ids[symbol] * num_terms if isinstance(symbol, NonTerminal) else 0)
+            for symbol in rhs if not isinstance(symbol, Epsilon))
+
     def peek_token() -> JsonToken:
         return tokens[token_i]
 
@@ -143,40 +184,37 @@ def create_parse_tree(stream: str, grammar: Grammar, parsing_table: dict[tuple[N
         token_i += 1
         return token
 
-    def descent(parent: ParseTreeNode):
-        token_terminal = Terminal(peek_token().type.value)
-        production = next(iter(parsing_table[parent.non_terminal, token_terminal])).rhs
-        for symbol in production:
-            if isinstance(symbol, Terminal):
+    def descent(parent: ParseTreeNode, row: int):
+        production = table[row + term_ids[peek_token().type.value]]
+        for is_terminal, symbol, child_row in production:
+            if is_terminal:
                 token = next_token()
                 parent.children.append(token)
-            elif isinstance(symbol, Epsilon):
-                continue
-            elif isinstance(symbol, NonTerminal):
+            else:
                 node = ParseTreeNode(symbol, [])
-                descent(node)
+                descent(node, child_row)
                 parent.children.append(node)
 
-    descent(root)
+    descent(root, nt_ids[grammar.start_symbol] * num_terms)
     return root
 
 
 class SDTNode:
+    __slots__ = ('non_terminal', 'inh', 'syn')
+
     def __init__(self, non_terminal: NonTerminal, inh, syn):
         self.non_terminal = non_terminal
         self.inh = inh
         self.syn = syn
 
 
-def syntax_directed_translation(stream: str, json_grammar: Grammar) -> dict:
+def syntax_directed_translation(tokens: list[JsonToken], json_grammar: Grammar) -> dict:
     """
-    Parse an json text into a dictionary object,
-    such that json.loads(stream) == syntax_directed_translation(stream, json_grammar)
+    Parse json tokens into a dictionary object, such that
+    json.loads(stream) == syntax_directed_translation(JsonLexer(stream).tokenize(), json_grammar)
     """
 
-    Array, Array1, Element, Elements, Elements1, Member, Members, Members1, Object, Object1, Value = sorted(json_grammar.non_terminals())
     root = SDTNode(json_grammar.start_symbol, None, None)
-    tokens = list(JsonLexer(stream).tokens())
     token_i = 0
 
     def peek_token() -> JsonToken:
@@ -189,133 +227,288 @@ def syntax_directed_translation(stream: str, json_grammar: Grammar) -> dict:
         token_i += 1
         return token
 
-    def descent(node: SDTNode):
-        terminal = Terminal(peek_token().type.value)
-        if node.non_terminal == Array:
-            if terminal == lsb:
-                next_token()    # consume [
-                array1 = SDTNode(Array1, inh=[], syn=None)
-                descent(array1)
+    # The descent is iterative: the work stack holds SDTNodes still to expand
+    # and deferred semantic actions (plain callables) to run once the nodes
+    # pushed above them are done — LIFO order keeps the LL(1) left-to-right
+    # descent and runs each action at the point the recursive version would.
+    # Each handler is looked up in a dict by non-terminal, replacing the long
+    # elif chain, and deep documents no longer hit the recursion limit.
+    stack = []
+    push = stack.append
+
+    def handle_array(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == lsb:
+            next_token()    # consume [
+            array1 = SDTNode(Array1, inh=[], syn=None)
+
+            def finish():
                 node.syn = array1.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Array1:
-            if terminal == lsb:
-                elements = SDTNode(Elements, inh=node.inh, syn=None)
-                descent(elements)
-                next_token()    # consume ]
-                node.syn = elements.syn
-            elif terminal == rsb:
-                next_token()    # consume ]
-                node.syn = node.inh
-            elif terminal in [false, null, number, string, true, lcb]:
-                elements = SDTNode(Elements, inh=node.inh, syn=None)
-                descent(elements)
+
+            push(finish)
+            push(array1)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_array1(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal in (lsb, false, null, number, string, true, lcb):
+            elements = SDTNode(Elements, inh=node.inh, syn=None)
+
+            def finish():
                 next_token()    # consume ]
                 node.syn = elements.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Element:
-            if terminal in [lsb, false, null, number, string, true, lcb]:
-                value = SDTNode(Value, inh=None, syn=None)
-                descent(value)
+
+            push(finish)
+            push(elements)
+        elif terminal == rsb:
+            next_token()    # consume ]
+            node.syn = node.inh
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_element(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal in (lsb, false, null, number, string, true, lcb):
+            value = SDTNode(Value, inh=None, syn=None)
+
+            def finish():
                 node.syn = value.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Elements:
-            if terminal in [lsb, false, null, number, string, true, lcb]:
-                element = SDTNode(Element, inh=None, syn=None)
-                descent(element)
+
+            push(finish)
+            push(value)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_elements(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal in (lsb, false, null, number, string, true, lcb):
+            element = SDTNode(Element, inh=None, syn=None)
+            elements1 = SDTNode(Elements1, inh=node.inh, syn=None)
+
+            def collect():
                 node.inh.append(element.syn)
-                elements1 = SDTNode(Elements1, inh=node.inh, syn=None)
-                descent(elements1)
+
+            def finish():
                 node.syn = elements1.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Elements1:
-            if terminal == comma:
-                next_token()    # consume ,
-                elements = SDTNode(Elements, inh=node.inh, syn=None)
-                descent(elements)
+
+            push(finish)
+            push(elements1)
+            push(collect)
+            push(element)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_elements1(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == comma:
+            next_token()    # consume ,
+            elements = SDTNode(Elements, inh=node.inh, syn=None)
+
+            def finish():
                 node.syn = elements.syn
-            elif terminal == rsb:
-                node.syn = node.inh
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Member:
-            if terminal == string:
-                key = next_token().value    # consume string
-                next_token()    # consume :
-                element = SDTNode(Element, inh=None, syn=None)
-                descent(element)
+
+            push(finish)
+            push(elements)
+        elif terminal == rsb:
+            node.syn = node.inh
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_member(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == string:
+            key = next_token().value    # consume string
+            next_token()    # consume :
+            element = SDTNode(Element, inh=None, syn=None)
+
+            def finish():
                 node.inh[key] = element.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Members:
-            if terminal == string:
-                member = SDTNode(Member, inh=node.inh, syn=None)
-                descent(member)
-                members1 = SDTNode(Members1, inh=node.inh, syn=None)
-                descent(members1)
+
+            push(finish)
+            push(element)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_members(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == string:
+            member = SDTNode(Member, inh=node.inh, syn=None)
+            members1 = SDTNode(Members1, inh=node.inh, syn=None)
+
+            def finish():
                 node.syn = members1.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Members1:
-            if terminal == comma:
-                next_token()    # consume ,
-                members = SDTNode(Members, inh=node.inh, syn=None)
-                descent(members)
+
+            push(finish)
+            push(members1)
+            push(member)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_members1(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == comma:
+            next_token()    # consume ,
+            members = SDTNode(Members, inh=node.inh, syn=None)
+
+            def finish():
                 node.syn = members.syn
-            elif terminal == rcb:
-                node.syn = node.inh
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Object:
-            if terminal == lcb:
-                next_token()    # consume {
-                object1 = SDTNode(Object1, inh={}, syn=None)
-                descent(object1)
+
+            push(finish)
+            push(members)
+        elif terminal == rcb:
+            node.syn = node.inh
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_object(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == lcb:
+            next_token()    # consume {
+            object1 = SDTNode(Object1, inh={}, syn=None)
+
+            def finish():
                 node.syn = object1.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Object1:
-            if terminal == string:
-                members = SDTNode(Members, inh=node.inh, syn=None)
-                descent(members)
+
+            push(finish)
+            push(object1)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_object1(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == string:
+            members = SDTNode(Members, inh=node.inh, syn=None)
+
+            def finish():
                 next_token()    # consume }
                 node.syn = members.syn
-            elif terminal == rcb:
-                next_token()    # consume }
-                node.syn = node.inh
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
-        elif node.non_terminal == Value:
-            if terminal == lsb:
-                array = SDTNode(Array, inh=None, syn=None)
-                descent(array)
+
+            push(finish)
+            push(members)
+        elif terminal == rcb:
+            next_token()    # consume }
+            node.syn = node.inh
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    def handle_value(node: SDTNode):
+        terminal = _TERMINAL_BY_JSONTYPE[peek_token().type]
+        if terminal == lsb:
+            array = SDTNode(Array, inh=None, syn=None)
+
+            def finish():
                 node.syn = array.syn
-            elif terminal in [false, null, number, string, true]:
-                node.syn = next_token().value     # consume value
-            elif terminal == lcb:
-                object = SDTNode(Object, inh=None, syn=None)
-                descent(object)
+
+            push(finish)
+            push(array)
+        elif terminal in (false, null, number, string, true):
+            node.syn = next_token().value     # consume value
+        elif terminal == lcb:
+            object = SDTNode(Object, inh=None, syn=None)
+
+            def finish():
                 node.syn = object.syn
-            else:
-                print(f'Unexpected token {terminal} at {node.non_terminal}')
 
-    descent(root)
+            push(finish)
+            push(object)
+        else:
+            print(f'Unexpected token {terminal} at {node.non_terminal}')
+
+    handlers = {
+        Array: handle_array,
+        Array1: handle_array1,
+        Element: handle_element,
+        Elements: handle_elements,
+        Elements1: handle_elements1,
+        Member: handle_member,
+        Members: handle_members,
+        Members1: handle_members1,
+        Object: handle_object,
+        Object1: handle_object1,
+        Value: handle_value,
+    }
+
+    push(root)
+    while stack:
+        task = stack.pop()
+        if isinstance(task, SDTNode):
+            handlers[task.non_terminal](task)
+        else:
+            task()
+
     return root.syn
 
 
-json_grammar = build_json_grammar()
+def fast_loads(stream: str):
+    """
+    Parse a json text with the C-implemented json module — orders of
+    magnitude faster than the pure-Python pipeline, which stays as the
+    educational reference path. Falls back to syntax_directed_translation
+    for documents nested too deeply for json.loads (the iterative descent
+    has no recursion limit); note the fallback returns every number as
+    float, as the lexer does.
+    """
+    try:
+        return json.loads(stream)
+    except RecursionError:
+        return syntax_directed_translation(JsonLexer(stream).tokenize(), json_grammar)
+
+
+# The grammar and its LL(1) parsing table are fixed values recomputed on
+# every import (left factoring plus the whole FIRST/FOLLOW analysis), so
+# they are pickle-cached next to this file. The cache is rebuilt whenever
+# any module the computation depends on is newer than it; any load problem
+# just falls back to computing.
+_TABLE_CACHE = Path(__file__).with_name('json_parsing_table.pkl')
+
+
+def _load_or_build_parsing_table():
+    sources_mtime = max(
+        Path(__file__).with_name(source).stat().st_mtime
+        for source in ('json_parser.py', 'json_lexer.py', 'grammar.py', 'LL1.py'))
+
+    try:
+        if _TABLE_CACHE.stat().st_mtime >= sources_mtime:
+            with open(_TABLE_CACHE, 'rb') as f:
+                return pickle.load(f)
+    except Exception:
+        # unpickling corrupt data can raise nearly anything (ValueError,
+        # TypeError, ... besides PickleError); any load problem just means
+        # rebuilding below
+        pass
+
+    G = build_json_grammar()
+    table = LL1.construct_parsing_table(G)
+    try:
+        with open(_TABLE_CACHE, 'wb') as f:
+            pickle.dump((G, table), f)
+    except OSError:
+        pass
+
+    return G, table
+
+
+json_grammar, parsing_table = _load_or_build_parsing_table()
 # pprint(sorted(json_grammar.non_terminals()))
 
-parsing_table = LL1.construct_parsing_table(json_grammar)
+# bind the non-terminals generated by left factoring once; previously
+# syntax_directed_translation re-sorted and unpacked the whole set per call,
+# shadowing the module-level Array/Object/... bindings in the process
+_generated = {nt.symbol: nt for nt in json_grammar.non_terminals() if nt.id != 0}
+Array1 = _generated['Array']
+Elements1 = _generated['Elements']
+Members1 = _generated['Members']
+Object1 = _generated['Object']
+
 # pprint(parsing_table)
 
 json_text = """ [1, 2, "hello", ["world"], { "pi": 3.14159, "numbers": [1, 2, 3, 4, 5] } ] """
 
-ast = create_parse_tree(json_text, json_grammar, parsing_table)
-# print(ast.as_graphviz({}))
+# lex once, parse twice: both entry points only move an index over the tokens
+json_tokens = JsonLexer(json_text).tokenize()
+
+ast = create_parse_tree(json_tokens, json_grammar, parsing_table)
+# print(ast.as_graphviz())
 
-pprint(syntax_directed_translation(json_text, json_grammar))
+pprint(syntax_directed_translation(json_tokens, json_grammar))
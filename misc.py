@@ -1,5 +1,5 @@
 from grammar import Grammar
-from LR import ParsingTable, SHIFT, REDUCE, ACCEPT
+from LR import ParsingTable, dot, SHIFT, REDUCE, ACCEPT
 
 
 def generate_automaton_graphviz(pt: ParsingTable) -> str:
@@ -38,8 +38,9 @@ Generate canonical set in pure latex representation.
         lines += [rf'I_{i}  &= \left.\begin{{cases}}']
         items = sorted(items)
         for item in items:
+            rhs = item.rhs[:item.dot_pos] + (dot,) + item.rhs[item.dot_pos:]
             lines += [
-                f'\t[{item.lhs} \\to {"~".join(map(str, item.rhs))}, {item.lookahead}] \\\\']
+                f'\t[{item.lhs} \\to {"~".join(map(str, rhs))}, {item.lookahead}] \\\\']
         lines += [r'\end{cases}\right\} \\']
     return '\n'.join(lines)
 